@@ -97,23 +97,24 @@ class Dejavu:
         iterator = pool.imap_unordered(Dejavu._fingerprint_worker, worker_input)
 
         # Loop till we have all of them
-        while True:
-            try:
-                song_name, hashes, file_hash = next(iterator)
-            except multiprocessing.TimeoutError:
-                continue
-            except StopIteration:
-                break
-            except Exception:
-                print("Failed fingerprinting")
-                # Print traceback because we can't reraise it here
-                traceback.print_exc(file=sys.stdout)
-            else:
-                sid = self.db.insert_song(song_name, file_hash, len(hashes), filename)
-
-                self.db.insert_hashes(sid, hashes)
-                self.db.set_song_fingerprinted(sid)
-                self.__load_fingerprinted_audio_hashes()
+        with self.db.bulk_ingest():
+            while True:
+                try:
+                    song_name, hashes, file_hash = next(iterator)
+                except multiprocessing.TimeoutError:
+                    continue
+                except StopIteration:
+                    break
+                except Exception:
+                    print("Failed fingerprinting")
+                    # Print traceback because we can't reraise it here
+                    traceback.print_exc(file=sys.stdout)
+                else:
+                    sid = self.db.insert_song(song_name, file_hash, len(hashes), filename)
+
+                    self.db.insert_hashes(sid, hashes)
+                    self.db.set_song_fingerprinted(sid)
+                    self.__load_fingerprinted_audio_hashes()
 
         pool.close()
         pool.join()
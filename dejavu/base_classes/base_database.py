@@ -1,5 +1,6 @@
 import abc
 import importlib
+from contextlib import contextmanager
 from typing import Dict, List, Tuple
 
 from dejavu.config.settings import DATABASES
@@ -33,6 +34,14 @@ class BaseDatabase(object, metaclass=abc.ABCMeta):
         """
         pass
 
+    @contextmanager
+    def bulk_ingest(self):
+        """
+        Wraps the insertion of many songs at once, letting the database defer
+        any work it can do more efficiently in bulk until the block is done.
+        """
+        yield
+
     @abc.abstractmethod
     def empty(self) -> None:
         """
@@ -1,4 +1,5 @@
 import abc
+from functools import lru_cache
 from typing import Dict, List, Tuple
 
 from dejavu.base_classes.base_database import BaseDatabase
@@ -202,7 +203,7 @@ class CommonDatabase(BaseDatabase, metaclass=abc.ABCMeta):
         with self.cursor() as cur:
             for index in range(0, len(values), batch_size):
                 # Create our IN part of the query
-                query = self.SELECT_MULTIPLE % ', '.join([self.IN_MATCH] * len(values[index: index + batch_size]))
+                query = self.select_multiple_query(len(values[index: index + batch_size]))
 
                 cur.execute(query, values[index: index + batch_size])
 
@@ -217,6 +218,19 @@ class CommonDatabase(BaseDatabase, metaclass=abc.ABCMeta):
 
             return results, dedup_hashes
 
+    @classmethod
+    @lru_cache(maxsize=None)
+    def select_multiple_query(cls, size: int) -> str:
+        """
+        Builds the SELECT_MULTIPLE query for the given amount of hashes. Only a couple of
+        distinct sizes show up in practice (the batch size and the last batch), so each
+        query string is generated once per class and reused afterwards.
+
+        :param size: number of hashes in the IN part of the query.
+        :return: the query string.
+        """
+        return cls.SELECT_MULTIPLE % ', '.join([cls.IN_MATCH] * size)
+
     def delete_songs_by_id(self, song_ids: List[int], batch_size: int = 1000) -> None:
         """
         Given a list of song ids it deletes all songs specified and their corresponding fingerprints.
@@ -1,6 +1,11 @@
 import sqlite3
 import os
+import threading
+from collections import defaultdict
 from contextlib import contextmanager
+from itertools import chain, islice
+
+import numpy as np
 
 from dejavu.base_classes.common_database import CommonDatabase
 from typing import Dict, List, Tuple
@@ -19,25 +24,54 @@ class Sqlite3Database(CommonDatabase):
         );
     """
 
+    # The fingerprints table is clustered on its primary key (WITHOUT ROWID), so the table itself is
+    # the (hash, song_id, offset) B-tree and hash lookups never have to visit a separate table heap.
     CREATE_FINGERPRINTS_TABLE = """
         CREATE TABLE IF NOT EXISTS fingerprints (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            song_id INTEGER,
-            hash TEXT,
-            offset INTEGER,
+            hash BLOB NOT NULL,
+            song_id INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            PRIMARY KEY (hash, song_id, offset),
             FOREIGN KEY(song_id) REFERENCES songs(id)
-        );
+        ) WITHOUT ROWID;
     """
 
-    CREATE_UNIQUE_CONSTRAINT = "CREATE UNIQUE INDEX IF NOT EXISTS idx_hash_offset ON fingerprints (hash, song_id, offset);"
+    SELECT_FINGERPRINTS_SCHEMA = "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'fingerprints'"
+
+    RENAME_LEGACY_FINGERPRINTS = "ALTER TABLE fingerprints RENAME TO legacy_fingerprints"
+
+    COPY_LEGACY_FINGERPRINTS = """
+        INSERT OR IGNORE INTO fingerprints (hash, song_id, offset)
+        SELECT hex_to_blob(hash), song_id, offset FROM legacy_fingerprints
+    """
+
+    DROP_LEGACY_FINGERPRINTS = "DROP TABLE IF EXISTS legacy_fingerprints"
 
     CREATE_PATH_INDEX = "CREATE INDEX IF NOT EXISTS idx_file_path ON songs (file_path);"
 
+    # Partial index covering the fingerprinted = 1 predicate of SELECT_SONGS.
+    CREATE_FINGERPRINTED_INDEX = "CREATE INDEX IF NOT EXISTS idx_fp_songs ON songs (id) WHERE fingerprinted = 1;"
+
     SELECT = "SELECT hash, song_id, offset FROM fingerprints WHERE hash = ?"
     
     SELECT_ALL = "SELECT hash, song_id, offset FROM fingerprints"
 
     SELECT_MULTIPLE = "SELECT hash, song_id, offset FROM fingerprints WHERE hash IN (%s)"
+
+    # Probe hashes are bound as a single blob (?1) of concatenated fixed width (?2) hashes, which the
+    # recursive CTE splits back into (idx, hash) rows inside SQLite, no per hash binding from Python.
+    # The CROSS JOIN keeps the probe rows as the outer loop so every probe is a primary key lookup on
+    # fingerprints, and each probe carries its position (idx) so matches come back as plain integers.
+    SELECT_PROBE_MATCHES = """
+        WITH RECURSIVE probe_hashes(idx, hash) AS (
+            SELECT 0, substr(?1, 1, ?2) WHERE length(?1) >= ?2
+            UNION ALL
+            SELECT idx + 1, substr(?1, (idx + 1) * ?2 + 1, ?2) FROM probe_hashes
+            WHERE (idx + 2) * ?2 <= length(?1)
+        )
+        SELECT p.idx, f.song_id, f.offset
+        FROM probe_hashes p CROSS JOIN fingerprints f ON f.hash = p.hash
+    """
     
     SELECT_SONG = "SELECT id, name, file_path, file_hash FROM songs WHERE id = ?"
     
@@ -45,11 +79,111 @@ class Sqlite3Database(CommonDatabase):
     
     SELECT_NUM_FINGERPRINTS = "SELECT COUNT(*) as n FROM fingerprints"
 
-    SELECT_UNIQUE_SONG_IDS = "SELECT COUNT(DISTINCT song_id) as n FROM songs"
+    SELECT_UNIQUE_SONG_IDS = "SELECT COUNT(id) as n FROM songs WHERE fingerprinted = 1"
+
+    # Counters kept up to date on every write, so the counts don't need a full scan. Each one is
+    # initialized with its COUNT query only when missing (new database or one created before them).
+    NUM_FINGERPRINTS = "num_fingerprints"
+    NUM_SONGS = "num_songs"
+
+    CREATE_METADATA_TABLE = """
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    INIT_METADATA = """
+        INSERT INTO metadata (key, value) SELECT ?, (%s)
+        WHERE NOT EXISTS (SELECT 1 FROM metadata WHERE key = ?)
+    """
+
+    SELECT_METADATA = "SELECT value FROM metadata WHERE key = ?"
+
+    UPDATE_METADATA = "UPDATE metadata SET value = value + ? WHERE key = ?"
+
+    DROP_METADATA = "DROP TABLE IF EXISTS metadata"
 
     INSERT_FINGERPRINT = "INSERT OR IGNORE INTO fingerprints (song_id, hash, offset) VALUES (?, ?, ?)"
 
-    UPDATE_SONG_FINGERPRINTED = "UPDATE songs SET fingerprinted = 1 WHERE id = ?"
+    # Rows packed into a single multi-row INSERT, 300 rows * 3 columns stays under the
+    # 999 parameters limit of older SQLite builds.
+    INSERT_ROWS_PER_STATEMENT = 300
+
+    INSERT_FINGERPRINTS = "INSERT OR IGNORE INTO fingerprints (song_id, hash, offset) VALUES " + \
+        ", ".join(["(?, ?, ?)"] * INSERT_ROWS_PER_STATEMENT)
+
+    # While bulk ingesting, fingerprints are appended to an unindexed staging table and moved into
+    # the clustered fingerprints table in primary key order in batches, so the B-tree is built
+    # mostly sequentially instead of being split at random by every insert. The staging table is TEMP,
+    # so it belongs to the ingesting connection and other connections (or processes) never see it.
+    # Songs are only marked as fingerprinted once their fingerprints are flushed, so an interrupted
+    # ingest leaves them unfingerprinted and they get fingerprinted again on the next run.
+    CREATE_STAGING_TABLE = """
+        CREATE TEMP TABLE IF NOT EXISTS fingerprints_staging (
+            song_id INTEGER NOT NULL,
+            hash BLOB NOT NULL,
+            offset INTEGER NOT NULL
+        );
+    """
+
+    INSERT_STAGED_FINGERPRINT = "INSERT INTO temp.fingerprints_staging (song_id, hash, offset) VALUES (?, ?, ?)"
+
+    INSERT_STAGED_FINGERPRINTS = "INSERT INTO temp.fingerprints_staging (song_id, hash, offset) VALUES " + \
+        ", ".join(["(?, ?, ?)"] * INSERT_ROWS_PER_STATEMENT)
+
+    FLUSH_STAGED_FINGERPRINTS = """
+        INSERT OR IGNORE INTO main.fingerprints (hash, song_id, offset)
+        SELECT hash, song_id, offset FROM temp.fingerprints_staging
+        ORDER BY hash, song_id, offset
+    """
+
+    DELETE_STAGED_FINGERPRINTS = "DELETE FROM temp.fingerprints_staging"
+
+    DROP_STAGING_TABLE = "DROP TABLE IF EXISTS temp.fingerprints_staging"
+
+    # Staged rows that trigger a flush, checked after each song so a batch only holds whole songs.
+    # Bounds the memory of the (temp_store = MEMORY) staging table and what an interrupted ingest loses.
+    STAGING_FLUSH_ROWS = 500000
+
+    # Merging of shards, i.e. databases fingerprinted independently (e.g. by parallel workers).
+    ATTACH_SHARD = "ATTACH DATABASE ? AS shard"
+
+    DETACH_SHARD = "DETACH DATABASE shard"
+
+    SELECT_SHARD_FINGERPRINTS_SCHEMA = """
+        SELECT sql FROM shard.sqlite_master WHERE type = 'table' AND name = 'fingerprints'
+    """
+
+    # Fingerprinted songs of the shard not already fingerprinted in this database.
+    SELECT_SHARD_SONGS = """
+        SELECT s.id, s.name, s.file_path, s.file_hash, s.total_hashes
+        FROM shard.songs s
+        WHERE s.fingerprinted = 1
+        AND NOT EXISTS (SELECT 1 FROM main.songs m WHERE m.fingerprinted = 1 AND m.file_hash = s.file_hash)
+    """
+
+    INSERT_MERGED_SONG = """
+        INSERT INTO main.songs (name, file_path, file_hash, total_hashes, fingerprinted) VALUES (?, ?, ?, ?, 1)
+    """
+
+    CREATE_SONG_ID_MAP = """
+        CREATE TEMP TABLE IF NOT EXISTS song_id_map (shard_id INTEGER PRIMARY KEY, song_id INTEGER NOT NULL)
+    """
+
+    INSERT_SONG_ID_MAP = "INSERT INTO temp.song_id_map (shard_id, song_id) VALUES (?, ?)"
+
+    DELETE_SONG_ID_MAP = "DELETE FROM temp.song_id_map"
+
+    # %s is the shard hash column, converted with hex_to_blob for shards with the former rowid schema.
+    MERGE_FINGERPRINTS = """
+        INSERT OR IGNORE INTO main.fingerprints (hash, song_id, offset)
+        SELECT %s AS h, m.song_id, f.offset
+        FROM shard.fingerprints f JOIN temp.song_id_map m ON m.shard_id = f.song_id
+        ORDER BY h, m.song_id, f.offset
+    """
+
+    UPDATE_SONG_FINGERPRINTED = "UPDATE songs SET fingerprinted = 1 WHERE id = ? AND fingerprinted = 0"
 
     DELETE_UNFINGERPRINTED = "DELETE FROM songs WHERE fingerprinted = 0"
 
@@ -61,35 +195,247 @@ class Sqlite3Database(CommonDatabase):
 
     IN_MATCH = "?"  # SQLite uses `?` for parameter placeholders, not %s
 
+    # PRAGMAS (each one can be overridden by passing its lowercase name as a kwarg)
+    JOURNAL_MODE = "WAL"
+    SYNCHRONOUS = "NORMAL"
+    TEMP_STORE = "MEMORY"
+    MMAP_SIZE = 268435456  # 256 MB
+    CACHE_SIZE = -65536  # negative values are in KiB, i.e. 64 MB
+    BUSY_TIMEOUT = 5000  # milliseconds
+    PAGE_SIZE = 65536  # only applied on a brand new (empty) database file
+
+    # Size of the connection's prepared statement cache, statements are looked up by their SQL text.
+    CACHED_STATEMENTS = 256
+
     def __init__(self, db=None, **kwargs):
         self.db_path = db or "dejavu.db"
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.journal_mode = kwargs.get("journal_mode", self.JOURNAL_MODE)
+        self.synchronous = kwargs.get("synchronous", self.SYNCHRONOUS)
+        self.temp_store = kwargs.get("temp_store", self.TEMP_STORE)
+        self.mmap_size = kwargs.get("mmap_size", self.MMAP_SIZE)
+        self.cache_size = kwargs.get("cache_size", self.CACHE_SIZE)
+        self.busy_timeout = kwargs.get("busy_timeout", self.BUSY_TIMEOUT)
+        self.page_size = kwargs.get("page_size", self.PAGE_SIZE)
+        self.cached_statements = kwargs.get("cached_statements", self.CACHED_STATEMENTS)
+        self.staging_flush_rows = kwargs.get("staging_flush_rows", self.STAGING_FLUSH_ROWS)
+
+        # A single writer connection shared by every thread (WAL allows one writer at a time anyway),
+        # plus one lazily opened reader connection per thread so lookups can run concurrently.
+        self.conn = self.connect(check_same_thread=False)
+        # converts the hexadecimal TEXT hashes of the former rowid schema into raw bytes.
+        self.conn.create_function(
+            "hex_to_blob", 1, lambda hsh: bytes.fromhex(hsh) if isinstance(hsh, str) else hsh, deterministic=True
+        )
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._ingesting = False
+        self._staged_songs = []
+        self._staged_rows = 0
+        self.set_journal_mode()
         self.setup()
 
+    def connect(self, check_same_thread: bool = True, readonly: bool = False) -> sqlite3.Connection:
+        """
+        Opens a new connection to the database with the per connection PRAGMAs applied.
+
+        :param check_same_thread: whether the connection can only be used by the thread creating it.
+        :param readonly: whether any attempt to write through the connection should be rejected.
+        :return: the new connection.
+        """
+        conn = sqlite3.connect(self.db_path, check_same_thread=check_same_thread,
+                               cached_statements=self.cached_statements)
+        conn.executescript(f"""
+            PRAGMA synchronous = {self.synchronous};
+            PRAGMA temp_store = {self.temp_store};
+            PRAGMA mmap_size = {int(self.mmap_size)};
+            PRAGMA cache_size = {int(self.cache_size)};
+            PRAGMA busy_timeout = {int(self.busy_timeout)};
+        """)
+        if readonly:
+            conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    def set_journal_mode(self) -> None:
+        """
+        Sets the journal mode, which is persisted in the database file itself.
+
+        The page size can only be changed before the first table is created (and never
+        while in WAL mode), so it is set before switching the journal mode and only
+        when the database file is still empty.
+        """
+        if self.conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+            self.conn.execute("PRAGMA journal_mode = DELETE")
+            self.conn.execute(f"PRAGMA page_size = {int(self.page_size)}")
+
+        self.conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+
+    @property
+    def reader(self) -> sqlite3.Connection:
+        """
+        The read connection of the calling thread, opened on first use. In-memory
+        databases are private to their connection, so those always read through the writer.
+        """
+        if self.db_path == ":memory:":
+            return self.conn
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connect(readonly=True)
+        return conn
+
     @contextmanager
-    def cursor(self, dictionary=False):
-        if dictionary:
-            self.conn.row_factory = sqlite3.Row
-        else:
-            self.conn.row_factory = None
-    
-        cur = self.conn.cursor()
+    def cursor(self, dictionary=False, readonly=False):
+        """
+        Yields a cursor and commits (or rolls back) once the block is done.
+
+        :param dictionary: whether rows should be returned as sqlite3.Row instead of tuples.
+        :param readonly: whether the block only reads. It then uses the calling thread's reader
+        connection instead of the shared writer (which is held under a lock for the whole block),
+        and skips the commit/rollback since a SELECT never opens a transaction.
+        """
+        conn = self.reader if readonly else self.conn
+        shared = conn is self.conn
+        if shared:
+            self._write_lock.acquire()
+
         try:
-            yield cur
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            raise e
+            cur = conn.cursor()
+            cur.row_factory = sqlite3.Row if dictionary else None
+            try:
+                if readonly:
+                    yield cur
+                else:
+                    try:
+                        yield cur
+                        conn.commit()
+                    except Exception as e:
+                        conn.rollback()
+                        raise e
+            finally:
+                cur.close()
         finally:
-            cur.close()
+            if shared:
+                self._write_lock.release()
 
     def setup(self):
+        # the whole schema setup (including a migration) is committed at once or not at all,
+        # otherwise the DDL statements would each autocommit on their own.
         with self.cursor() as cur:
+            cur.execute("BEGIN IMMEDIATE")
             cur.execute(self.CREATE_SONGS_TABLE)
+            self.migrate_fingerprints(cur)
             cur.execute(self.CREATE_FINGERPRINTS_TABLE)
-            cur.execute(self.CREATE_UNIQUE_CONSTRAINT)
             cur.execute(self.CREATE_PATH_INDEX)
+            cur.execute(self.CREATE_FINGERPRINTED_INDEX)
+            cur.execute(self.CREATE_METADATA_TABLE)
+            cur.execute(self.INIT_METADATA % self.SELECT_NUM_FINGERPRINTS, (self.NUM_FINGERPRINTS,) * 2)
+            cur.execute(self.INIT_METADATA % self.SELECT_UNIQUE_SONG_IDS, (self.NUM_SONGS,) * 2)
+
+    def migrate_fingerprints(self, cur: sqlite3.Cursor) -> None:
+        """
+        Moves the fingerprints of a database created with the former rowid schema (``id`` column,
+        hexadecimal TEXT hashes and a separate unique index) into the WITHOUT ROWID table.
+
+        :param cur: cursor of the transaction the schema is being set up in.
+        """
+        row = cur.execute(self.SELECT_FINGERPRINTS_SCHEMA).fetchone()
+        if row is None or "WITHOUT ROWID" in row[0].upper():
+            return
+
+        cur.execute(self.RENAME_LEGACY_FINGERPRINTS)
+        cur.execute(self.CREATE_FINGERPRINTS_TABLE)
+        cur.execute(self.COPY_LEGACY_FINGERPRINTS)
+        cur.execute(self.DROP_LEGACY_FINGERPRINTS)
+
+    @contextmanager
+    def bulk_ingest(self):
+        """
+        Stages every fingerprint inserted within the block and loads them into the
+        fingerprints table, sorted, every staging_flush_rows rows and once the block is done.
+        Fingerprints inserted meanwhile are not matched, and their songs are not set as
+        fingerprinted, until their batch is flushed.
+        """
+        # songs left unfingerprinted by an interrupted run are fingerprinted again from scratch.
+        self.delete_unfingerprinted_songs()
+        with self.cursor() as cur:
+            cur.execute(self.CREATE_STAGING_TABLE)
+
+        self._staged_songs = []
+        self._staged_rows = 0
+        self._ingesting = True
+        try:
+            yield
+        finally:
+            self._ingesting = False
+            self.flush_staged_fingerprints()
+            with self.cursor() as cur:
+                cur.execute(self.DROP_STAGING_TABLE)
+
+    def flush_staged_fingerprints(self) -> None:
+        """
+        Moves the staged fingerprints into the fingerprints table and sets their songs
+        as fingerprinted, both in a single transaction.
+        """
+        with self.cursor() as cur:
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(self.FLUSH_STAGED_FINGERPRINTS)
+            self.update_counter(cur, self.NUM_FINGERPRINTS, cur.rowcount)
+            cur.execute(self.DELETE_STAGED_FINGERPRINTS)
+            if self._staged_songs:
+                cur.executemany(self.UPDATE_SONG_FINGERPRINTED, ((song_id,) for song_id in self._staged_songs))
+                self.update_counter(cur, self.NUM_SONGS, cur.rowcount)
+
+        self._staged_songs = []
+        self._staged_rows = 0
+
+    def update_counter(self, cur: sqlite3.Cursor, key: str, delta: int) -> None:
+        """
+        Adds delta to one of the counters in the metadata table.
+
+        :param cur: cursor of the transaction the counted rows were changed in.
+        :param key: counter to update.
+        :param delta: amount of rows added (or removed if negative).
+        """
+        if delta:
+            cur.execute(self.UPDATE_METADATA, (delta, key))
+
+    def merge_from(self, path: str) -> int:
+        """
+        Merges the fingerprinted songs of another sqlite database (a shard built on its own,
+        for instance by a parallel worker) into this one. Songs get new identifiers and their
+        fingerprints are copied over in primary key order. Songs whose file hash is already
+        fingerprinted here are skipped. Shards still on the former rowid schema have their
+        hexadecimal hashes converted to raw bytes on the way.
+
+        :param path: path to the shard database file.
+        :return: the number of songs merged.
+        """
+        # ATTACH would silently create an empty database for a missing file.
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Shard database not found: {path}")
+
+        with self._write_lock:
+            self.conn.execute(self.ATTACH_SHARD, (path,))
+            try:
+                with self.cursor() as cur:
+                    cur.execute(self.CREATE_SONG_ID_MAP)
+                    cur.execute(self.DELETE_SONG_ID_MAP)
+
+                    songs = cur.execute(self.SELECT_SHARD_SONGS).fetchall()
+                    for shard_id, name, file_path, file_hash, total_hashes in songs:
+                        cur.execute(self.INSERT_MERGED_SONG, (name, file_path, file_hash, total_hashes))
+                        cur.execute(self.INSERT_SONG_ID_MAP, (shard_id, cur.lastrowid))
+
+                    schema = cur.execute(self.SELECT_SHARD_FINGERPRINTS_SCHEMA).fetchone()[0]
+                    legacy = "WITHOUT ROWID" not in schema.upper()
+                    cur.execute(self.MERGE_FINGERPRINTS % ("hex_to_blob(f.hash)" if legacy else "f.hash"))
+                    self.update_counter(cur, self.NUM_FINGERPRINTS, cur.rowcount)
+                    self.update_counter(cur, self.NUM_SONGS, len(songs))
+                    cur.execute(self.DELETE_SONG_ID_MAP)
+            finally:
+                self.conn.execute(self.DETACH_SHARD)
+
+        return len(songs)
 
     def insert_song(self, song_name: str, file_hash: str, total_hashes: int, file_path: str = None) -> int:
         """
@@ -108,32 +454,91 @@ class Sqlite3Database(CommonDatabase):
             return cur.lastrowid
 
     def get_song_by_id(self, song_id: int) -> Dict[str, str]:
-        with self.cursor(dictionary=True) as cur:
+        with self.cursor(dictionary=True, readonly=True) as cur:
             cur.execute("SELECT id, name, file_path, file_hash, total_hashes FROM songs WHERE id = ?", (song_id,))
             row = cur.fetchone()
-            if row:
-                try:
-                    return dict(row.items())
-                except AttributeError:
-                    col_names = [desc[0] for desc in cur.description]
-                    return dict(zip(col_names, row))
-            return None
+            return dict(row) if row else None
 
     def get_songs(self) -> List[Dict[str, str]]:
-        with self.cursor() as cur:
+        with self.cursor(dictionary=True, readonly=True) as cur:
             cur.execute(self.SELECT_SONGS)
-            rows = cur.fetchall()
-            results = []
-            for row in rows:
-                try:
-                    results.append(dict(row.items()))
-                except AttributeError:
-                    # Fallback if row is a plain tuple
-                    col_names = [desc[0] for desc in cur.description]
-                    results.append(dict(zip(col_names, row)))
-            return results
-
-    def insert_hashes(self, song_id: int, hashes: List[Tuple[str, int]], batch_size: int = 1000) -> None:
+            return [dict(row) for row in cur.fetchall()]
+
+    def query(self, fingerprint: str = None) -> List[Tuple]:
+        """
+        Returns all matching fingerprint entries associated with
+        the given hash as parameter, if None is passed it returns all entries.
+
+        :param fingerprint: part of a sha1 hash, in hexadecimal format
+        :return: a list of fingerprint records stored in the db.
+        """
+        with self.cursor(readonly=True) as cur:
+            if fingerprint:
+                cur.execute(self.SELECT, (bytes.fromhex(fingerprint),))
+            else:  # select all if no key
+                cur.execute(self.SELECT_ALL)
+            return list(cur)
+
+    def get_num_songs(self) -> int:
+        """
+        Returns the song's count stored.
+
+        :return: the amount of songs in the database.
+        """
+        with self.cursor(readonly=True) as cur:
+            return cur.execute(self.SELECT_METADATA, (self.NUM_SONGS,)).fetchone()[0]
+
+    def get_num_fingerprints(self) -> int:
+        """
+        Returns the fingerprints' count stored.
+
+        :return: the number of fingerprints in the database.
+        """
+        with self.cursor(readonly=True) as cur:
+            return cur.execute(self.SELECT_METADATA, (self.NUM_FINGERPRINTS,)).fetchone()[0]
+
+    def set_song_fingerprinted(self, song_id):
+        """
+        Sets a specific song as having all fingerprints in the database.
+
+        :param song_id: song identifier.
+        """
+        if self._ingesting:
+            # its fingerprints are still staged, it is set once they are flushed.
+            self._staged_songs.append(song_id)
+            if self._staged_rows >= self.staging_flush_rows:
+                self.flush_staged_fingerprints()
+            return
+
+        with self.cursor() as cur:
+            cur.execute(self.UPDATE_SONG_FINGERPRINTED, (song_id,))
+            self.update_counter(cur, self.NUM_SONGS, cur.rowcount)
+
+    def insert(self, fingerprint: str, song_id: int, offset: int):
+        """
+        Inserts a single fingerprint into the database.
+
+        :param fingerprint: Part of a sha1 hash, in hexadecimal format
+        :param song_id: Song identifier this fingerprint is off
+        :param offset: The offset this fingerprint is from.
+        """
+        self.insert_hashes(song_id, [(fingerprint, offset)])
+
+    def empty(self) -> None:
+        """
+        Called when the database should be cleared of all data.
+        """
+        with self.cursor() as cur:
+            cur.execute(self.DROP_FINGERPRINTS)
+            cur.execute(self.DROP_STAGING_TABLE)
+            cur.execute(self.DROP_SONGS)
+            cur.execute(self.DROP_METADATA)
+        self._staged_songs = []
+        self._staged_rows = 0
+
+        self.setup()
+
+    def insert_hashes(self, song_id: int, hashes: List[Tuple[str, int]]) -> None:
         """
         Insert a multitude of fingerprints.
 
@@ -141,14 +546,35 @@ class Sqlite3Database(CommonDatabase):
         :param hashes: A sequence of tuples in the format (hash, offset)
             - hash: Part of a sha1 hash, in hexadecimal format
             - offset: Offset this hash was created from/at.
-        :param batch_size: insert batches.
         """
-        values = [(song_id, hsh.lower(), int(offset)) for hsh, offset in hashes]
+        # hashes are stored as raw bytes, half the size of their hexadecimal representation. Offsets
+        # go through int() since sqlite3 would silently bind a numpy integer as a BLOB of its bytes.
+        values = ((song_id, bytes.fromhex(hsh), int(offset)) for hsh, offset in hashes)
 
+        if self._ingesting:
+            insert_one, insert_many = self.INSERT_STAGED_FINGERPRINT, self.INSERT_STAGED_FINGERPRINTS
+        else:
+            insert_one, insert_many = self.INSERT_FINGERPRINT, self.INSERT_FINGERPRINTS
+
+        # a single write transaction for the whole song, committed on cursor exit.
         with self.cursor() as cur:
-            for index in range(0, len(hashes), batch_size):
-                cur.executemany(self.INSERT_FINGERPRINT, values[index: index + batch_size])
-    
+            cur.execute("BEGIN IMMEDIATE")
+            changes = self.conn.total_changes
+            while True:
+                rows = list(islice(values, self.INSERT_ROWS_PER_STATEMENT))
+                if len(rows) < self.INSERT_ROWS_PER_STATEMENT:
+                    # the remainder goes through the single row statement.
+                    cur.executemany(insert_one, rows)
+                    break
+                cur.execute(insert_many, tuple(chain.from_iterable(rows)))
+
+            # staged fingerprints are counted once they are flushed into the fingerprints table.
+            if self._ingesting:
+                self._staged_rows += self.conn.total_changes - changes
+            else:
+                # rows skipped by INSERT OR IGNORE don't count as changes.
+                self.update_counter(cur, self.NUM_FINGERPRINTS, self.conn.total_changes - changes)
+
     def return_matches(self, hashes: List[Tuple[str, int]],
                        batch_size: int = 1000) -> Tuple[List[Tuple[int, int]], Dict[int, int]]:
         """
@@ -157,43 +583,61 @@ class Sqlite3Database(CommonDatabase):
         :param hashes: A sequence of tuples in the format (hash, offset)
             - hash: Part of a sha1 hash, in hexadecimal format
             - offset: Offset this hash was created from/at.
-        :param batch_size: number of query's batches.
+        :param batch_size: unused, all hashes are matched with a single query. Kept for compatibility.
         :return: a list of (sid, offset_difference) tuples and a
         dictionary with the amount of hashes matched (not considering
         duplicated hashes) in each song.
             - song id: Song identifier
             - offset_difference: (database_offset - sampled_offset)
         """
-        # Create a dictionary of hash => offset pairs for later lookups
-        mapper = {}
+        # Create a dictionary of hash => offset pairs for later lookups,
+        # keyed by the same raw bytes stored in the fingerprints table.
+        mapper = defaultdict(list)
+        # the same hash shows up at several offsets, so each distinct one is converted only once.
+        keys = {}
         for hsh, offset in hashes:
-            hsh = hsh.lower()
-            if hsh in mapper:
-                mapper[hsh].append(offset)
-            else:
-                mapper[hsh] = [offset]
+            key = keys.get(hsh)
+            if key is None:
+                key = keys[hsh] = bytes.fromhex(hsh)
+            mapper[key].append(offset)
 
-        values = list(mapper.keys())
+        if not mapper:
+            return [], {}
 
-        # in order to count each hash only once per db offset we use the dic below
-        dedup_hashes = {}
+        # probing in hash order walks the fingerprints B-tree from left to right, so consecutive
+        # lookups share their interior pages and leaves are read in file order.
+        mapper = dict(sorted(mapper.items()))
 
-        results = []
-        with self.cursor() as cur:
-            for index in range(0, len(values), batch_size):
-                # Create our IN part of the query
-                query = self.SELECT_MULTIPLE % ', '.join([self.IN_MATCH] * len(values[index: index + batch_size]))
-
-                cur.execute(query, values[index: index + batch_size])
-
-                for hsh, sid, offset in cur:
-                    hsh = hsh.lower()
-                    if sid not in dedup_hashes.keys():
-                        dedup_hashes[sid] = 1
-                    else:
-                        dedup_hashes[sid] += 1
-                    #  we now evaluate all offset for each  hash matched
-                    for song_sampled_offset in mapper[hsh]:
-                        results.append((sid, offset - song_sampled_offset))
-
-            return results, dedup_hashes
+        width = len(next(iter(mapper)))
+        if any(len(hsh) != width for hsh in mapper):
+            raise ValueError("All hashes to match must have the same length.")
+
+        with self.cursor(readonly=True) as cur:
+            cur.execute(self.SELECT_PROBE_MATCHES, (b"".join(mapper), width))
+            rows = cur.fetchall()
+
+        if not rows:
+            return [], {}
+
+        # (probe index, song id, db offset) for every matched fingerprint.
+        matches = np.array(rows, dtype=np.int64)
+        idxs, sids, offsets = matches[:, 0], matches[:, 1], matches[:, 2]
+
+        # in order to count each hash only once per db offset we count the matched rows per song.
+        song_ids, counts = np.unique(sids, return_counts=True)
+        dedup_hashes = dict(zip(song_ids.tolist(), counts.tolist()))
+
+        # all the sampled offsets laid out contiguously in probe index order,
+        # each hash owning the slice [starts[idx], starts[idx] + lengths[idx]).
+        lengths = np.fromiter((len(v) for v in mapper.values()), dtype=np.int64, count=len(mapper))
+        starts = np.cumsum(lengths) - lengths
+        sampled_offsets = np.fromiter(chain.from_iterable(mapper.values()), dtype=np.int64, count=int(lengths.sum()))
+
+        #  we now evaluate all offset for each hash matched: every matched row is repeated
+        #  once per sampled offset of its hash and paired with each of them.
+        repeats = lengths[idxs]
+        rows_idx = np.repeat(np.arange(len(matches)), repeats)
+        positions = np.arange(len(rows_idx)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        differences = offsets[rows_idx] - sampled_offsets[starts[idxs][rows_idx] + positions]
+
+        return list(zip(sids[rows_idx].tolist(), differences.tolist())), dedup_hashes
@@ -141,7 +141,8 @@ def get_2D_peaks(arr2D: np.array, plot: bool = False, amp_min: int = DEFAULT_AMP
         plt.gca().invert_yaxis()
         plt.show()
 
-    return list(zip(freqs_filter, times_filter))
+    # plain python ints, so hashes and offsets need no further conversion down the line (e.g. to be stored).
+    return list(zip(freqs_filter.tolist(), times_filter.tolist()))
 
 
 def generate_hashes(peaks: List[Tuple[int, int]], fan_value: int = DEFAULT_FAN_VALUE) -> List[Tuple[str, int]]: